@@ -5,193 +5,384 @@ This version uses a "fallback" strategy for complex dates.
 """
 
 import re
+import threading
 import dateparser
 from dateparser.search import search_dates
 from datetime import datetime
 
 # --- !! SET TO TRUE TO SEE DEBUGGING !! ---
+# Only used by the module-level functions below.
+# Extractor objects carry their own debug setting.
 DEBUG = True
 # -----------------------------------------------
 
-# --- Entity Extraction Functions ---
+# --- Precompiled Patterns ---
+# Compiled once at import and never changed afterwards,
+# so all Extractor instances (and threads) can share them.
 
-def extract_event_type(text):
-    text = text.lower()
-    known_types = [
-        "skateboard", "snowboard", "bmx", 
-        "music festival", "film festival", "debate"
-    ]
-    
-    found_types = []
-    for event_type in known_types:
-        if event_type in text:
-            negation_match = re.search(r"(not|don't like|no)\s+(.{{0,10}})?{0}".format(re.escape(event_type)), text)
-            if not negation_match:
-                found_types.append(event_type)
-
-    if len(found_types) == 1:
-        return found_types[0]
-    return None
+KNOWN_EVENT_TYPES = (
+    "skateboard", "snowboard", "bmx",
+    "music festival", "film festival", "debate"
+)
 
-def extract_contestant_count(text):
-    text = text.lower()
-    match = re.search(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)", text)
-    if match:
-        return int(match.group(1))
-    
-    match_num_only = re.search(r"^(\d+)$", text.strip())
-    if match_num_only:
-        return int(match_num_only.group(1))
-    return None
+NEGATION_PATTERNS = {
+    event_type: re.compile(r"(not|don't like|no)\s+(.{0,10})?" + re.escape(event_type))
+    for event_type in KNOWN_EVENT_TYPES
+}
 
-def extract_scoring(text):
-    text = text.lower()
-    if DEBUG: print(f"\n[DEBUG SCORING] Received text: '{text}'")
-
-    # Finds "judges" or "final say" *UNLESS* it's like "10 judges".
-    has_judges_match = re.search(r"(judges|final say)", text)
-    is_numeric_judges = re.search(r"\d+\s+judges", text)
-    has_judges = bool(has_judges_match and not is_numeric_judges)
-    has_audience = "audience" in text
-    
-    if DEBUG: print(f"[DEBUG SCORING] has_judges_match: {bool(has_judges_match)}")
-    if DEBUG: print(f"[DEBUG SCORING] is_numeric_judges: {bool(is_numeric_judges)}")
-    if DEBUG: print(f"[DEBUG SCORING] -> has_judges: {has_judges}")
-    if DEBUG: print(f"[DEBUG SCORING] -> has_audience: {has_audience}")
-
-    if (has_judges and has_audience) or "both" in text:
-        if DEBUG: print("[DEBUG SCORING] -> Returning: 'both'\n")
-        return "both"
-    if has_judges:
-        if DEBUG: print("[DEBUG SCORING] -> Returning: 'judges'\n")
-        return "judges"
-    if has_audience:
-        if DEBUG: print("[DEBUG SCORING] -> Returning: 'audience'\n")
-        return "audience"
-        
-    if DEBUG: print("[DEBUG SCORING] -> Returning: None\n")
-    return None
-
-# --- NEW FALLBACK FUNCTION ---
-def extract_date_fallback(original_text, settings):
+COUNT_PATTERN = re.compile(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)")
+NUMBER_ONLY_PATTERN = re.compile(r"^(\d+)$")
+NUMBER_PATTERN = re.compile(r"\d+")
+JUDGES_PATTERN = re.compile(r"(judges|final say)")
+NUMERIC_JUDGES_PATTERN = re.compile(r"\d+\s+judges")
+
+# Keywords that hint at a date but might be missed by the main parser
+DATE_FALLBACK_KEYWORDS = (
+    'christmas', 'easter', 'new year', 'weekend', 'saturday',
+    'sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'
+)
+
+# --- Date Prefilter ---
+# Cheap check run before the date extractor. A message is only sent on to
+# dateparser if it has a number, a word containing one of these stems
+# (checked as substrings, so "saturday", "weekend", "months" etc. all
+# count), or one of dateparser's short English forms below. Anything else
+# ("judges", "yes", "both") skips the expensive date parsing entirely.
+
+DATE_HINT_STEMS = (
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun',
+    'today', 'tonight', 'tomorrow', 'yesterday', 'now', 'noon', 'midnight',
+    'morning', 'afternoon', 'evening', 'night',
+    'day', 'week', 'month', 'year', 'hour', 'minute', 'second', 'fortnight', 'decade',
+    'ago', 'christmas', 'easter', 'halloween'
+)
+
+# Short forms from dateparser's English locale data that the stems miss.
+# dateparser reads these as dates on their own ("we" is Wednesday, "th"
+# Thursday, "yr" a year), so "We should use judges" has to be parsed too.
+# They are only counted as whole words, or nearly every message would match.
+DATE_HINT_WORDS = (
+    'mo', 'tu', 'we', 'th', 'fr', 'sa', 'su', 'am', 'pm',
+    'y', 'yr', 'wk', 'd', 'h', 'hr', 'hrs', 'm', 'min', 'mins', 's', 'sec', 'secs',
+    'till date'
+)
+
+DATE_HINT_PATTERN = re.compile(
+    r"\b[ap]\.?m\b|"
+    + r"(?<![a-z])(?:" + "|".join(re.escape(word) for word in DATE_HINT_WORDS) + r")(?![a-z])|"
+    + "|".join(re.escape(stem) for stem in DATE_HINT_STEMS)
+)
+
+class PrefilterStats:
+    """Counts how many messages the date prefilter let skip the date extractor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+
+    def record(self, skipped):
+        with self._lock:
+            self.checked += 1
+            if skipped:
+                self.skipped += 1
+
+    def snapshot(self):
+        with self._lock:
+            skip_rate = self.skipped / self.checked if self.checked else 0.0
+            return {"checked": self.checked, "skipped": self.skipped, "skip_rate": skip_rate}
+
+# Shared by the module-level functions below
+PREFILTER_STATS = PrefilterStats()
+
+# --- Normalized Message ---
+
+class Message:
     """
-    A fallback function to find complex relative dates.
-    It looks for date keywords and searches a small window around them.
+    One user message, normalized once per turn.
+
+    update_details_and_get_feedback builds one of these and hands it to
+    every extractor, so the text is lowercased once and the number and
+    count spans are found once. Extractors still accept plain strings too.
     """
-    if DEBUG: print("[DEBUG DATE] -> Main search failed. Trying fallback...")
-    
-    text = original_text.lower()
-    # Keywords that hint at a date but might be missed by the main parser
-    date_keywords = [
-        'christmas', 'easter', 'new year', 'weekend', 'saturday', 
-        'sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday',
-        'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'
-    ]
-    
-    for keyword in date_keywords:
-        if keyword in text:
-            # Find the position of the keyword
-            pos = text.find(keyword)
-            
-            # Extract a window of text (e.g., 30 chars before, 30 after)
-            start = max(0, pos - 30)
-            end = min(len(text), pos + 30)
-            window = text[start:end]
-            
-            if DEBUG: print(f"[DEBUG DATE FALLBACK] Found keyword '{keyword}'. Searching window: '{window}'")
-            
-            search_results = search_dates(window, settings=settings)
-            
-            if search_results:
-                if DEBUG: print(f"[DEBUG DATE FALLBACK] -> search_dates SUCCESS: {search_results}")
-                return search_results[0][1] # Return the datetime object
-
-    if DEBUG: print("[DEBUG DATE FALLBACK] -> Fallback failed.")
-    return None
-
-def extract_date(text):
+
+    __slots__ = ("text", "lower", "number_only", "number_spans",
+                 "count_match", "count_spans", "numeric_judges_spans")
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        # Match if the whole message is one number ("12"), else None
+        self.number_only = NUMBER_ONLY_PATTERN.search(self.lower.strip())
+        # (start, end) of every run of digits
+        self.number_spans = [m.span() for m in NUMBER_PATTERN.finditer(self.lower)]
+        # Contestant-count phrases ("12 people"), first match kept for its number
+        count_matches = list(COUNT_PATTERN.finditer(self.lower))
+        self.count_match = count_matches[0] if count_matches else None
+        self.count_spans = [m.span() for m in count_matches]
+        # "10 judges" phrases: judges as a number, not as the scoring method
+        self.numeric_judges_spans = [m.span() for m in NUMERIC_JUDGES_PATTERN.finditer(self.lower)]
+
+    def without(self, spans):
+        """The lowercased text with each span replaced by a space."""
+        parts = []
+        last = 0
+        for start, end in sorted(spans):
+            parts.append(self.lower[last:start])
+            parts.append(" ")
+            last = end
+        parts.append(self.lower[last:])
+        return "".join(parts)
+
+
+def as_message(text):
+    return text if isinstance(text, Message) else Message(text)
+
+# --- Extractor ---
+
+class Extractor:
     """
-    Uses dateparser.search_dates.
-    We aggressively clean the text of known "noise numbers"
-    (like contestant counts) before passing to the parser.
+    One configuration of the extraction logic.
+
+    Apart from its prefilter counters (which have their own lock), an
+    Extractor is never modified after __init__ and keeps no per-call
+    state, so one instance can be shared by a thread pool without locks.
+    Callers that want different settings just create their own instance
+    instead of changing the module-level DEBUG.
+
+    dateparser keeps module-level caches of its own. They are safe under
+    the GIL; free-threaded builds have not been tested.
     """
-    if DEBUG: print(f"\n[DEBUG DATE] Received raw text: '{text}'")
-    
-    clean_text = text.lower()
-    
-    # 1. Remove contestant count phrases
-    clean_text = re.sub(
-        r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)",
-        " ", clean_text, flags=re.IGNORECASE
-    )
-    if DEBUG: print(f"[DEBUG DATE] After contestant clean: '{clean_text}'")
-            
-    # 2. Remove "X judges" phrases
-    clean_text = re.sub(r"(\d+)\s+judges", " ", clean_text, flags=re.IGNORECASE)
-    if DEBUG: print(f"[DEBUG DATE] After judges clean: '{clean_text}'")
-    
-    # 3. Define parser settings
-    parser_settings = {
-        'PREFER_DATES_FROM': 'future',
-        # Get "now" from freezegun-patched datetime
-        'RELATIVE_BASE': datetime.now() 
-    }
-    
-    # 4. Now search the cleaned text
-    search_results = search_dates(
-        clean_text, 
-        languages=['en'],
-        settings=parser_settings
-    )
-    
-    if DEBUG: print(f"[DEBUG DATE] search_dates result: {search_results}")
-    
-    if search_results:
-        # Find the first date that isn't just a number
-        for date_text, parsed_date in search_results:
-            if DEBUG: print(f"[DEBUG DATE] Checking result: ('{date_text}', {parsed_date})")
-            
-            is_digit = date_text.strip().isdigit()
-            if DEBUG: print(f"[DEBUG DATE] -> is_digit: {is_digit}")
-            
-            if not is_digit:
-                formatted_date = parsed_date.strftime("%Y-%m-%d")
-                if DEBUG: print(f"[DEBUG DATE] -> Found valid date. Returning: {formatted_date}\n")
-                return formatted_date
-        
-        if DEBUG: print("[DEBUG DATE] All results were digits. Trying fallback...")
-
-    # --- FALLBACK LOGIC ---
-    # If search_results was None or all were digits, try fallback
-    
-    # We pass the *original* text to the fallback
-    fallback_date = extract_date_fallback(text, parser_settings)
-    
-    if fallback_date:
-        formatted_date = fallback_date.strftime("%Y-%m-%d")
-        if DEBUG: print(f"[DEBUG DATE] -> Fallback SUCCESS. Returning: {formatted_date}\n")
-        return formatted_date
-
-    if DEBUG: print("[DEBUG DATE] -> All methods failed. Returning None.\n")
-    return None
-
-# --- Main Chat Logic (for testing) ---
-
-def update_details_and_get_feedback(text, event_details):
-    # This is a simplified version for testing,
-    # as we don't need the feedback messages.
-    
-    if event_details["event_type"] is None:
-        event_details["event_type"] = extract_event_type(text)
 
-    if event_details["contestant_count"] is None:
-        event_details["contestant_count"] = extract_contestant_count(text)
+    def __init__(self, debug=False, clock=datetime.now, prefilter_stats=None):
+        self.debug = debug
+        # Gives "now" for relative dates ("next saturday").
+        # Tests and batch jobs can pin it instead of patching datetime.
+        self.clock = clock
+        self.prefilter_stats = prefilter_stats if prefilter_stats is not None else PrefilterStats()
 
-    if event_details["scoring"] is None:
-        event_details["scoring"] = extract_scoring(text)
+    # --- Entity Extraction ---
 
-    if event_details["date"] is None:
-        event_details["date"] = extract_date(text)
+    def extract_event_type(self, text):
+        text = as_message(text).lower
+
+        found_types = []
+        for event_type in KNOWN_EVENT_TYPES:
+            if event_type in text:
+                negation_match = NEGATION_PATTERNS[event_type].search(text)
+                if not negation_match:
+                    found_types.append(event_type)
+
+        if len(found_types) == 1:
+            return found_types[0]
+        return None
+
+    def extract_contestant_count(self, text):
+        message = as_message(text)
+        match = message.count_match
+        if match:
+            return int(match.group(1))
+
+        match_num_only = message.number_only
+        if match_num_only:
+            return int(match_num_only.group(1))
+        return None
+
+    def extract_scoring(self, text):
+        message = as_message(text)
+        text = message.lower
+        debug = self.debug
+        if debug: print(f"\n[DEBUG SCORING] Received text: '{text}'")
+
+        # Finds "judges" or "final say" *UNLESS* it's like "10 judges".
+        has_judges_match = JUDGES_PATTERN.search(text)
+        is_numeric_judges = message.numeric_judges_spans
+        has_judges = bool(has_judges_match and not is_numeric_judges)
+        has_audience = "audience" in text
+
+        if debug: print(f"[DEBUG SCORING] has_judges_match: {bool(has_judges_match)}")
+        if debug: print(f"[DEBUG SCORING] is_numeric_judges: {bool(is_numeric_judges)}")
+        if debug: print(f"[DEBUG SCORING] -> has_judges: {has_judges}")
+        if debug: print(f"[DEBUG SCORING] -> has_audience: {has_audience}")
+
+        if (has_judges and has_audience) or "both" in text:
+            if debug: print("[DEBUG SCORING] -> Returning: 'both'\n")
+            return "both"
+        if has_judges:
+            if debug: print("[DEBUG SCORING] -> Returning: 'judges'\n")
+            return "judges"
+        if has_audience:
+            if debug: print("[DEBUG SCORING] -> Returning: 'audience'\n")
+            return "audience"
+
+        if debug: print("[DEBUG SCORING] -> Returning: None\n")
+        return None
+
+    # --- Fallback for complex dates ---
+
+    def extract_date_fallback(self, original_text, settings):
+        """
+        A fallback function to find complex relative dates.
+        It looks for date keywords and searches a small window around them.
+        """
+        debug = self.debug
+        if debug: print("[DEBUG DATE] -> Main search failed. Trying fallback...")
+
+        text = as_message(original_text).lower
+
+        for keyword in DATE_FALLBACK_KEYWORDS:
+            if keyword in text:
+                # Find the position of the keyword
+                pos = text.find(keyword)
+
+                # Extract a window of text (e.g., 30 chars before, 30 after)
+                start = max(0, pos - 30)
+                end = min(len(text), pos + 30)
+                window = text[start:end]
+
+                if debug: print(f"[DEBUG DATE FALLBACK] Found keyword '{keyword}'. Searching window: '{window}'")
+
+                search_results = search_dates(window, settings=settings)
+
+                if search_results:
+                    if debug: print(f"[DEBUG DATE FALLBACK] -> search_dates SUCCESS: {search_results}")
+                    return search_results[0][1] # Return the datetime object
+
+        if debug: print("[DEBUG DATE FALLBACK] -> Fallback failed.")
+        return None
+
+    def extract_date(self, text, now=None):
+        """
+        Uses dateparser.search_dates.
+        We aggressively clean the text of known "noise numbers"
+        (like contestant counts) before passing to the parser.
+        Relative dates are resolved from `now` (default: the extractor's clock).
+        """
+        message = as_message(text)
+        debug = self.debug
+        if debug: print(f"\n[DEBUG DATE] Received raw text: '{message.text}'")
+
+        # 1. Remove contestant count phrases (spans already found by the Message)
+        if debug: print(f"[DEBUG DATE] After contestant clean: '{message.without(message.count_spans)}'")
+
+        # 2. Remove "X judges" phrases
+        clean_text = message.without(message.count_spans + message.numeric_judges_spans)
+        if debug: print(f"[DEBUG DATE] After judges clean: '{clean_text}'")
+
+        # 3. Define parser settings (built per call, never shared)
+        parser_settings = {
+            'PREFER_DATES_FROM': 'future',
+            'RELATIVE_BASE': now or self.clock()
+        }
+
+        # 4. Now search the cleaned text
+        search_results = search_dates(
+            clean_text,
+            languages=['en'],
+            settings=parser_settings
+        )
+
+        if debug: print(f"[DEBUG DATE] search_dates result: {search_results}")
+
+        if search_results:
+            # Find the first date that isn't just a number
+            for date_text, parsed_date in search_results:
+                if debug: print(f"[DEBUG DATE] Checking result: ('{date_text}', {parsed_date})")
+
+                is_digit = date_text.strip().isdigit()
+                if debug: print(f"[DEBUG DATE] -> is_digit: {is_digit}")
+
+                if not is_digit:
+                    formatted_date = parsed_date.strftime("%Y-%m-%d")
+                    if debug: print(f"[DEBUG DATE] -> Found valid date. Returning: {formatted_date}\n")
+                    return formatted_date
+
+            if debug: print("[DEBUG DATE] All results were digits. Trying fallback...")
+
+        # --- FALLBACK LOGIC ---
+        # If search_results was None or all were digits, try fallback
+
+        # We pass the *original* text to the fallback
+        fallback_date = self.extract_date_fallback(message, parser_settings)
+
+        if fallback_date:
+            formatted_date = fallback_date.strftime("%Y-%m-%d")
+            if debug: print(f"[DEBUG DATE] -> Fallback SUCCESS. Returning: {formatted_date}\n")
+            return formatted_date
+
+        if debug: print("[DEBUG DATE] -> All methods failed. Returning None.\n")
+        return None
+
+    def may_contain_date(self, text):
+        """
+        The date prefilter. False means nothing in the text looks like a
+        date to dateparser's English data, so the date lookup is skipped.
+        A heuristic: True does not promise a date.
+        """
+        message = as_message(text)
+        # A bare number ("12") never gives a date here:
+        # search_dates results that are all digits are thrown away.
+        if message.number_only:
+            return False
+        return bool(message.number_spans) or bool(DATE_HINT_PATTERN.search(message.lower))
+
+    # --- Main Chat Logic (for testing) ---
+
+    def update_details_and_get_feedback(self, text, event_details, now=None):
+        # This is a simplified version for testing,
+        # as we don't need the feedback messages.
+        # `now` pins the reference date for this turn (default: the clock).
+
+        # Normalize once; every extractor below reads from this.
+        text = as_message(text)
+
+        if event_details["event_type"] is None:
+            event_details["event_type"] = self.extract_event_type(text)
+
+        if event_details["contestant_count"] is None:
+            event_details["contestant_count"] = self.extract_contestant_count(text)
+
+        if event_details["scoring"] is None:
+            event_details["scoring"] = self.extract_scoring(text)
+
+        if event_details["date"] is None:
+            skip_date = not self.may_contain_date(text)
+            self.prefilter_stats.record(skip_date)
+            if not skip_date:
+                event_details["date"] = self.extract_date(text, now)
+
+    def get_next_question(self, event_details):
+        return get_next_question(event_details)
+
+# --- Module-level API ---
+# Kept so existing callers (and the chat loop) still work.
+# Each call builds a throwaway Extractor so the current DEBUG value is used.
+
+def _default_extractor():
+    return Extractor(debug=DEBUG, prefilter_stats=PREFILTER_STATS)
+
+def extract_event_type(text):
+    return _default_extractor().extract_event_type(text)
+
+def extract_contestant_count(text):
+    return _default_extractor().extract_contestant_count(text)
+
+def extract_scoring(text):
+    return _default_extractor().extract_scoring(text)
+
+def extract_date_fallback(original_text, settings):
+    return _default_extractor().extract_date_fallback(original_text, settings)
+
+def extract_date(text, now=None):
+    return _default_extractor().extract_date(text, now)
+
+def may_contain_date(text):
+    return _default_extractor().may_contain_date(text)
+
+def update_details_and_get_feedback(text, event_details, now=None):
+    return _default_extractor().update_details_and_get_feedback(text, event_details, now)
 
 def get_next_question(event_details):
     """Determines the next question to ask based on missing info."""
@@ -203,4 +394,4 @@ def get_next_question(event_details):
         return "How will scoring work? (judges, audience, or both)"
     if event_details["date"] is None:
         return "When is the event? (e.g., 'next Saturday', 'Dec 20th')"
-    return None # All details are filled
\ No newline at end of file
+    return None # All details are filled
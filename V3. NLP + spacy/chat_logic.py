@@ -5,156 +5,389 @@ Uses spaCy (to find) + parse() (for absolute) + search_dates() (for relative)
 """
 
 import re
+import time
+import threading
 import dateparser
-from dateparser.search import search_dates 
+from dateparser.search import search_dates
 import spacy # https://spacy.io/
 from datetime import datetime
 
 # --- !! SET TO TRUE TO SEE DEBUGGING !! ---
+# Only used by the module-level functions below.
+# Extractor objects carry their own debug setting.
 DEBUG = True
 # -----------------------------------------------
 
 # --- Load NLP Model ---
-try:
-    nlp = spacy.load("en_core_web_sm")
-    if DEBUG: print("[INFO] spaCy model 'en_core_web_sm' loaded.")
-except IOError:
-    print("\n--- ERROR ---")
-    print("spaCy model 'en_core_web_sm' not found.")
-    print("Please run: python -m spacy download en_core_web_sm")
-    print("-------------\n")
-    exit()
+# Loaded once per process. Extractors share this handle unless
+# they are given their own model.
+# When registry.py reloads this file after an edit, it hands the names in
+# RELOAD_KEEP to the new module, so the model from the previous load is reused.
+RELOAD_KEEP = ("nlp",)
+if "nlp" not in globals():
+    try:
+        nlp = spacy.load("en_core_web_sm")
+        if DEBUG: print("[INFO] spaCy model 'en_core_web_sm' loaded.")
+    except IOError:
+        print("\n--- ERROR ---")
+        print("spaCy model 'en_core_web_sm' not found.")
+        print("Please run: python -m spacy download en_core_web_sm")
+        print("-------------\n")
+        exit()
 # ----------------------
 
+# --- Precompiled Patterns ---
+# Compiled once at import and never changed afterwards,
+# so all Extractor instances (and threads) can share them.
 
-# --- Entity Extraction Functions ---
+KNOWN_EVENT_TYPES = (
+    "skateboard", "snowboard", "bmx",
+    "music festival", "film festival", "debate"
+)
 
-def extract_event_type(text):
-    text = text.lower()
-    known_types = [
-        "skateboard", "snowboard", "bmx", 
-        "music festival", "film festival", "debate"
-    ]
-    
-    found_types = []
-    for event_type in known_types:
-        if event_type in text:
-            negation_match = re.search(r"(not|don't like|no)\s+(.{{0,10}})?{0}".format(re.escape(event_type)), text)
-            if not negation_match:
-                found_types.append(event_type)
-
-    if len(found_types) == 1:
-        return found_types[0]
-    return None
+NEGATION_PATTERNS = {
+    event_type: re.compile(r"(not|don't like|no)\s+(.{0,10})?" + re.escape(event_type))
+    for event_type in KNOWN_EVENT_TYPES
+}
 
-def extract_contestant_count(text):
-    text = text.lower()
-    match = re.search(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)", text)
-    if match:
-        return int(match.group(1))
-    
-    match_num_only = re.search(r"^(\d+)$", text.strip())
-    if match_num_only:
-        return int(match_num_only.group(1))
-    return None
+COUNT_PATTERN = re.compile(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)")
+NUMBER_ONLY_PATTERN = re.compile(r"^(\d+)$")
+NUMBER_PATTERN = re.compile(r"\d+")
+JUDGES_PATTERN = re.compile(r"(judges|final say)")
+NUMERIC_JUDGES_PATTERN = re.compile(r"\d+\s+judges")
 
-def extract_scoring(text):
-    text = text.lower()
-    if DEBUG: print(f"\n[DEBUG SCORING] Received text: '{text}'")
-
-    # Finds "judges" or "final say" *UNLESS* it's like "10 judges".
-    has_judges_match = re.search(r"(judges|final say)", text)
-    is_numeric_judges = re.search(r"\d+\s+judges", text)
-    has_judges = bool(has_judges_match and not is_numeric_judges)
-    has_audience = "audience" in text
-    
-    if DEBUG: print(f"[DEBUG SCORING] has_judges_match: {bool(has_judges_match)}")
-    if DEBUG: print(f"[DEBUG SCORING] is_numeric_judges: {bool(is_numeric_judges)}")
-    if DEBUG: print(f"[DEBUG SCORING] -> has_judges: {has_judges}")
-    if DEBUG: print(f"[DEBUG SCORING] -> has_audience: {has_audience}")
-
-    if (has_judges and has_audience) or "both" in text:
-        if DEBUG: print("[DEBUG SCORING] -> Returning: 'both'\n")
-        return "both"
-    if has_judges:
-        if DEBUG: print("[DEBUG SCORING] -> Returning: 'judges'\n")
-        return "judges"
-    if has_audience:
-        if DEBUG: print("[DEBUG SCORING] -> Returning: 'audience'\n")
-        return "audience"
-        
-    if DEBUG: print("[DEBUG SCORING] -> Returning: None\n")
+# --- Date Prefilter ---
+# Cheap check run before the date extractor. A message is only sent on to
+# dateparser if it has a number, a word containing one of these stems
+# (checked as substrings, so "saturday", "weekend", "months" etc. all
+# count), or one of dateparser's short English forms below. Anything else
+# ("judges", "yes", "both") skips the expensive date parsing entirely.
+
+DATE_HINT_STEMS = (
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun',
+    'today', 'tonight', 'tomorrow', 'yesterday', 'now', 'noon', 'midnight',
+    'morning', 'afternoon', 'evening', 'night',
+    'day', 'week', 'month', 'year', 'hour', 'minute', 'second', 'fortnight', 'decade',
+    'ago', 'christmas', 'easter', 'halloween'
+)
+
+# Short forms from dateparser's English locale data that the stems miss.
+# dateparser reads these as dates on their own ("we" is Wednesday, "th"
+# Thursday, "yr" a year), so "We should use judges" has to be parsed too.
+# They are only counted as whole words, or nearly every message would match.
+DATE_HINT_WORDS = (
+    'mo', 'tu', 'we', 'th', 'fr', 'sa', 'su', 'am', 'pm',
+    'y', 'yr', 'wk', 'd', 'h', 'hr', 'hrs', 'm', 'min', 'mins', 's', 'sec', 'secs',
+    'till date'
+)
+
+DATE_HINT_PATTERN = re.compile(
+    r"\b[ap]\.?m\b|"
+    + r"(?<![a-z])(?:" + "|".join(re.escape(word) for word in DATE_HINT_WORDS) + r")(?![a-z])|"
+    + "|".join(re.escape(stem) for stem in DATE_HINT_STEMS)
+)
+
+class PrefilterStats:
+    """Counts how many messages the date prefilter let skip the date extractor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+
+    def record(self, skipped):
+        with self._lock:
+            self.checked += 1
+            if skipped:
+                self.skipped += 1
+
+    def snapshot(self):
+        with self._lock:
+            skip_rate = self.skipped / self.checked if self.checked else 0.0
+            return {"checked": self.checked, "skipped": self.skipped, "skip_rate": skip_rate}
+
+# Shared by the module-level functions below
+PREFILTER_STATS = PrefilterStats()
+
+# --- Date Strategies ---
+# Each takes the text of a DATE entity and returns a datetime or None.
+
+def parse_date_entity(date_text, settings):
+    # Good for absolute dates (e.g., "Dec 10th")
+    return dateparser.parse(date_text, settings=settings)
+
+def search_date_entity(date_text, settings):
+    # Good for relative dates (e.g., "next saturday")
+    search_results = search_dates(date_text, settings=settings)
+    if search_results:
+        return search_results[0][1] # Get the datetime object
     return None
 
-def extract_date(text):
+DATE_STRATEGIES = {"parse": parse_date_entity, "search_dates": search_date_entity}
+DATE_STRATEGY_ORDER = ("parse", "search_dates") # Default: absolute first
+
+# --- Normalized Message ---
+
+class Message:
     """
-    Uses spaCy for NER to find the *text* of a date,
-    then tries parse() and search_dates() to parse it.
+    One user message, normalized once per turn.
+
+    update_details_and_get_feedback builds one of these and hands it to
+    every extractor, so the text is lowercased once and the number and
+    count spans are found once. Extractors still accept plain strings too.
     """
-    if DEBUG: print(f"\n[DEBUG DATE] Received raw text: '{text}'")
-    
-    doc = nlp(text)
-    if DEBUG: print(f"[DEBUG DATE] spaCy Entities found: {[(ent.text, ent.label_) for ent in doc.ents]}")
-
-    frozen_now = datetime.now()
-    if DEBUG: print(f"[DEBUG DATE] Relative base (frozen time): {frozen_now}")
-
-    # Define settings once
-    parser_settings = {
-        'PREFER_DATES_FROM': 'future',
-        'RELATIVE_BASE': frozen_now
-    }
-
-    for ent in doc.ents:
-        if ent.label_ == "DATE":
-            date_text = ent.text
-            if DEBUG: print(f"[DEBUG DATE] Found 'DATE' entity: '{date_text}'")
-            
-            # --- THIS IS THE FIX ---
-            # Strategy 1: Try dateparser.parse()
-            # This is good for absolute dates (e.g., "Dec 10th")
-            parsed_date = dateparser.parse(date_text, settings=parser_settings)
-            
-            if parsed_date:
-                formatted_date = parsed_date.strftime("%Y-%m-%d")
-                if DEBUG: print(f"[DEBUG DATE] -> parse() SUCCESS. Returning: {formatted_date}\n")
-                return formatted_date
-
-            # Strategy 2: Fallback to dateparser.search_dates()
-            # This is good for relative dates (e.g., "next saturday")
-            if DEBUG: print(f"[DEBUG DATE] -> parse() failed. Trying search_dates()...")
-            search_results = search_dates(date_text, settings=parser_settings)
-            
-            if DEBUG: print(f"[DEBUG DATE] -> search_dates() result: {search_results}")
-
-            if search_results:
-                parsed_date = search_results[0][1] # Get the datetime object
-                formatted_date = parsed_date.strftime("%Y-%m-%d")
-                if DEBUG: print(f"[DEBUG DATE] -> search_dates() SUCCESS. Returning: {formatted_date}\n")
-                return formatted_date
-            
-            if DEBUG: print(f"[DEBUG DATE] -> All parsers FAILED for '{date_text}'")
-    
-    if DEBUG: print("[DEBUG DATE] No 'DATE' entity found or parsed. Returning None.\n")
-    return None
 
-# --- Main Chat Logic (for testing) ---
+    __slots__ = ("text", "lower", "number_only", "number_spans",
+                 "count_match", "count_spans", "numeric_judges_spans")
 
-def update_details_and_get_feedback(text, event_details):
-    # This is a simplified version for testing,
-    # as we don't need the feedback messages.
-    
-    if event_details["event_type"] is None:
-        event_details["event_type"] = extract_event_type(text)
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        # Match if the whole message is one number ("12"), else None
+        self.number_only = NUMBER_ONLY_PATTERN.search(self.lower.strip())
+        # (start, end) of every run of digits
+        self.number_spans = [m.span() for m in NUMBER_PATTERN.finditer(self.lower)]
+        # Contestant-count phrases ("12 people"), first match kept for its number
+        count_matches = list(COUNT_PATTERN.finditer(self.lower))
+        self.count_match = count_matches[0] if count_matches else None
+        self.count_spans = [m.span() for m in count_matches]
+        # "10 judges" phrases: judges as a number, not as the scoring method
+        self.numeric_judges_spans = [m.span() for m in NUMERIC_JUDGES_PATTERN.finditer(self.lower)]
 
-    if event_details["contestant_count"] is None:
-        event_details["contestant_count"] = extract_contestant_count(text)
+    def without(self, spans):
+        """The lowercased text with each span replaced by a space."""
+        parts = []
+        last = 0
+        for start, end in sorted(spans):
+            parts.append(self.lower[last:start])
+            parts.append(" ")
+            last = end
+        parts.append(self.lower[last:])
+        return "".join(parts)
 
-    if event_details["scoring"] is None:
-        event_details["scoring"] = extract_scoring(text)
 
-    if event_details["date"] is None:
-        event_details["date"] = extract_date(text)
+def as_message(text):
+    return text if isinstance(text, Message) else Message(text)
+
+# --- Extractor ---
+
+class Extractor:
+    """
+    One configuration of the extraction logic (and the spaCy model it uses).
+
+    Apart from its prefilter counters (which have their own lock), an
+    Extractor is never modified after __init__ and keeps no per-call
+    state. Callers that want different settings just create their own
+    instance instead of changing the module-level DEBUG.
+
+    The spaCy model is not read-only, though: tokenizing unseen words adds
+    entries to its shared Vocab / StringStore, and dateparser fills its own
+    module-level caches. With the GIL, one instance can be shared by a
+    thread pool (checked: 8 threads give the same dates as one). On a
+    free-threaded build this has not been checked and spaCy makes no
+    promise, so give each thread its own nlp_model there.
+    """
+
+    def __init__(self, debug=False, nlp_model=None, clock=datetime.now, prefilter_stats=None,
+                 date_scheduler=None):
+        self.debug = debug
+        # Gives "now" for relative dates ("next saturday").
+        # Tests and batch jobs can pin it instead of patching datetime.
+        self.clock = clock
+        self.prefilter_stats = prefilter_stats if prefilter_stats is not None else PrefilterStats()
+        # Shared by every thread using this Extractor (see the class docstring).
+        self.nlp = nlp_model if nlp_model is not None else nlp
+        # Optional date_strategy.DateStrategyScheduler. When set, the two
+        # parsers are tried in the order that has worked best for phrases
+        # shaped like this one, once they are known to give the same dates.
+        self.date_scheduler = date_scheduler
+
+    # --- Entity Extraction ---
+
+    def extract_event_type(self, text):
+        text = as_message(text).lower
+
+        found_types = []
+        for event_type in KNOWN_EVENT_TYPES:
+            if event_type in text:
+                negation_match = NEGATION_PATTERNS[event_type].search(text)
+                if not negation_match:
+                    found_types.append(event_type)
+
+        if len(found_types) == 1:
+            return found_types[0]
+        return None
+
+    def extract_contestant_count(self, text):
+        message = as_message(text)
+        match = message.count_match
+        if match:
+            return int(match.group(1))
+
+        match_num_only = message.number_only
+        if match_num_only:
+            return int(match_num_only.group(1))
+        return None
+
+    def extract_scoring(self, text):
+        message = as_message(text)
+        text = message.lower
+        debug = self.debug
+        if debug: print(f"\n[DEBUG SCORING] Received text: '{text}'")
+
+        # Finds "judges" or "final say" *UNLESS* it's like "10 judges".
+        has_judges_match = JUDGES_PATTERN.search(text)
+        is_numeric_judges = message.numeric_judges_spans
+        has_judges = bool(has_judges_match and not is_numeric_judges)
+        has_audience = "audience" in text
+
+        if debug: print(f"[DEBUG SCORING] has_judges_match: {bool(has_judges_match)}")
+        if debug: print(f"[DEBUG SCORING] is_numeric_judges: {bool(is_numeric_judges)}")
+        if debug: print(f"[DEBUG SCORING] -> has_judges: {has_judges}")
+        if debug: print(f"[DEBUG SCORING] -> has_audience: {has_audience}")
+
+        if (has_judges and has_audience) or "both" in text:
+            if debug: print("[DEBUG SCORING] -> Returning: 'both'\n")
+            return "both"
+        if has_judges:
+            if debug: print("[DEBUG SCORING] -> Returning: 'judges'\n")
+            return "judges"
+        if has_audience:
+            if debug: print("[DEBUG SCORING] -> Returning: 'audience'\n")
+            return "audience"
+
+        if debug: print("[DEBUG SCORING] -> Returning: None\n")
+        return None
+
+    def extract_date(self, text, now=None):
+        """
+        Uses spaCy for NER to find the *text* of a date,
+        then tries parse() and search_dates() to parse it
+        (in that order, unless a date_scheduler has learned that the
+        other order is faster for phrases like this one; see
+        date_strategy.py for when that can change the date found).
+        Relative dates are resolved from `now` (default: the extractor's clock).
+        """
+        text = as_message(text).text
+        debug = self.debug
+        if debug: print(f"\n[DEBUG DATE] Received raw text: '{text}'")
+
+        doc = self.nlp(text)
+        if debug: print(f"[DEBUG DATE] spaCy Entities found: {[(ent.text, ent.label_) for ent in doc.ents]}")
+
+        frozen_now = now or self.clock()
+        if debug: print(f"[DEBUG DATE] Relative base (frozen time): {frozen_now}")
+
+        # Define settings once (per call, so threads never share them)
+        parser_settings = {
+            'PREFER_DATES_FROM': 'future',
+            'RELATIVE_BASE': frozen_now
+        }
+
+        for ent in doc.ents:
+            if ent.label_ == "DATE":
+                date_text = ent.text
+                if debug: print(f"[DEBUG DATE] Found 'DATE' entity: '{date_text}'")
+
+                scheduler = self.date_scheduler
+                if scheduler is None:
+                    order, compare = DATE_STRATEGY_ORDER, False
+                else:
+                    shape = scheduler.shape(date_text)
+                    order, compare = scheduler.plan(shape, DATE_STRATEGY_ORDER)
+
+                # When comparing, every parser runs (in the default order)
+                # so the scheduler can check they agree on this phrase.
+                found = {}
+                for strategy in order:
+                    started = time.perf_counter()
+                    parsed_date = DATE_STRATEGIES[strategy](date_text, parser_settings)
+                    if scheduler is not None:
+                        scheduler.record(shape, strategy, parsed_date is not None, time.perf_counter() - started)
+
+                    if parsed_date:
+                        found[strategy] = parsed_date.strftime("%Y-%m-%d")
+                        if not compare:
+                            break
+                    elif debug: print(f"[DEBUG DATE] -> {strategy}() failed.")
+
+                if compare:
+                    scheduler.record_comparison(shape, list(found.values()))
+
+                for strategy in order:
+                    if strategy in found:
+                        formatted_date = found[strategy]
+                        if debug: print(f"[DEBUG DATE] -> {strategy}() SUCCESS. Returning: {formatted_date}\n")
+                        return formatted_date
+
+                if debug: print(f"[DEBUG DATE] -> All parsers FAILED for '{date_text}'")
+
+        if debug: print("[DEBUG DATE] No 'DATE' entity found or parsed. Returning None.\n")
+        return None
+
+    def may_contain_date(self, text):
+        """
+        The date prefilter. False means nothing in the text looks like a
+        date to dateparser's English data, so the date lookup is skipped.
+        A heuristic: True does not promise a date. Bare numbers are not
+        skipped: spaCy may tag them as DATE.
+        """
+        message = as_message(text)
+        return bool(message.number_spans) or bool(DATE_HINT_PATTERN.search(message.lower))
+
+    # --- Main Chat Logic (for testing) ---
+
+    def update_details_and_get_feedback(self, text, event_details, now=None):
+        # This is a simplified version for testing,
+        # as we don't need the feedback messages.
+        # `now` pins the reference date for this turn (default: the clock).
+
+        # Normalize once; every extractor below reads from this.
+        text = as_message(text)
+
+        if event_details["event_type"] is None:
+            event_details["event_type"] = self.extract_event_type(text)
+
+        if event_details["contestant_count"] is None:
+            event_details["contestant_count"] = self.extract_contestant_count(text)
+
+        if event_details["scoring"] is None:
+            event_details["scoring"] = self.extract_scoring(text)
+
+        if event_details["date"] is None:
+            skip_date = not self.may_contain_date(text)
+            self.prefilter_stats.record(skip_date)
+            if not skip_date:
+                event_details["date"] = self.extract_date(text, now)
+
+    def get_next_question(self, event_details):
+        return get_next_question(event_details)
+
+# --- Module-level API ---
+# Kept so existing callers (and the chat loop) still work.
+# Each call builds a throwaway Extractor so the current DEBUG value is used.
+
+def _default_extractor():
+    return Extractor(debug=DEBUG, prefilter_stats=PREFILTER_STATS)
+
+def extract_event_type(text):
+    return _default_extractor().extract_event_type(text)
+
+def extract_contestant_count(text):
+    return _default_extractor().extract_contestant_count(text)
+
+def extract_scoring(text):
+    return _default_extractor().extract_scoring(text)
+
+def extract_date(text, now=None):
+    return _default_extractor().extract_date(text, now)
+
+def may_contain_date(text):
+    return _default_extractor().may_contain_date(text)
+
+def update_details_and_get_feedback(text, event_details, now=None):
+    return _default_extractor().update_details_and_get_feedback(text, event_details, now)
 
 def get_next_question(event_details):
     """Determines the next question to ask based on missing info."""
@@ -166,4 +399,4 @@ def get_next_question(event_details):
         return "How will scoring work? (judges, audience, or both)"
     if event_details["date"] is None:
         return "When is the event? (e.allg., 'next Saturday', 'Dec 20th')"
-    return None # All details are filled
\ No newline at end of file
+    return None # All details are filled
@@ -1,17 +1,64 @@
 # Old chat logic.
 
 import re
+import queue
 import dateparser
 from dateparser.search import search_dates # <-- New import
 from datetime import datetime
 
+from registration import RegistrationWriter
+from event_calendar import EventCalendar
+
 # --- !! SET TO TRUE TO SEE DATE DEBUGGING !! ---
 DEBUG = True
 
+# Max contestants across all events on a single day
+DAILY_CONTESTANT_CAPACITY = 1000
+# Seconds to wait for room in the registration queue before giving up
+SUBMIT_TIMEOUT = 5
+
+COUNT_PATTERN = re.compile(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)")
+NUMBER_ONLY_PATTERN = re.compile(r"^(\d+)$")
+
+# Normalized Message
+
+class Message:
+    """
+    One user message, normalized once per turn.
+    update_details_and_get_feedback builds one and passes it to every
+    extractor, so the text is lowercased once and count spans are found once.
+    """
+
+    __slots__ = ("text", "lower", "number_only", "count_match", "count_spans")
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        # Match if the whole message is one number ("12"), else None
+        self.number_only = NUMBER_ONLY_PATTERN.search(self.lower.strip())
+        # Contestant-count phrases ("12 people"), first match kept for its number
+        count_matches = list(COUNT_PATTERN.finditer(self.lower))
+        self.count_match = count_matches[0] if count_matches else None
+        self.count_spans = [m.span() for m in count_matches]
+
+    def without(self, spans):
+        """The lowercased text with each span replaced by a space."""
+        parts = []
+        last = 0
+        for start, end in sorted(spans):
+            parts.append(self.lower[last:start])
+            parts.append(" ")
+            last = end
+        parts.append(self.lower[last:])
+        return "".join(parts)
+
+def as_message(text):
+    return text if isinstance(text, Message) else Message(text)
+
 # Entity Extraction Functions
 
 def extract_event_type(text):
-    text = text.lower()
+    text = as_message(text).lower
     known_types = [
         "skateboard", "snowboard", "bmx", 
         "music festival", "film festival", "debate"
@@ -29,18 +76,18 @@ def extract_event_type(text):
     return None
 
 def extract_contestant_count(text):
-    text = text.lower()
-    match = re.search(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)", text)
+    message = as_message(text)
+    match = message.count_match
     if match:
         return int(match.group(1))
     
-    match_num_only = re.search(r"^(\d+)$", text.strip())
+    match_num_only = message.number_only
     if match_num_only:
         return int(match_num_only.group(1))
     return None
 
 def extract_scoring(text):
-    text = text.lower()
+    text = as_message(text).lower
     has_judges = "judges" in text or "final say" in text
     has_audience = "audience" in text
 
@@ -52,21 +99,25 @@ def extract_scoring(text):
         return "audience"
     return None
 
-def extract_date(text):
+def extract_date(text, now=None):
     """
     Uses dateparser.search.search_dates to find dates inside
     a string containing other "noise" text.
+    Relative dates are resolved from `now` (default: datetime.now()).
     """
-    if DEBUG: print(f"\n[DEBUG DATE] Received raw text: '{text}'")
+    message = as_message(text)
+    if DEBUG: print(f"\n[DEBUG DATE] Received raw text: '{message.text}'")
     
     # Clean contestant count to not confuse dateparser.
-    text_for_date = re.sub(r"(\d+)\s*(contestants|participants|people|peple|entries|to compete|will compete)",
-                         " ", text.lower(), flags=re.IGNORECASE)
+    text_for_date = message.without(message.count_spans)
     
     if DEBUG: print(f"[DEBUG DATE] Cleaned text for search: '{text_for_date}'")
 
     # Use search_dates to find dates in text.
-    search_results = search_dates(text_for_date, settings={'PREFER_DATES_FROM': 'future'})
+    search_results = search_dates(text_for_date, settings={
+        'PREFER_DATES_FROM': 'future',
+        'RELATIVE_BASE': now or datetime.now()
+    })
     
     if DEBUG: print(f"[DEBUG DATE] dateparser.search_dates result: {search_results}")
     
@@ -83,11 +134,15 @@ def extract_date(text):
 
 # Main Chat Logic
 
-def update_details_and_get_feedback(text, event_details):
+def update_details_and_get_feedback(text, event_details, now=None):
     """
     Attempts to fill slots and returns a list of *newly added* confirmations.
+    `now` pins the reference date for relative dates (default: datetime.now()).
     """
     feedback_messages = []
+
+    # Normalize once; every extractor below reads from this.
+    text = as_message(text)
     
     # Check each piece of missing info
     if event_details["event_type"] is None:
@@ -109,7 +164,7 @@ def update_details_and_get_feedback(text, event_details):
             feedback_messages.append(f"Scoring by **{scoring}**. Noted.")
 
     if event_details["date"] is None:
-        date = extract_date(text)
+        date = extract_date(text, now)
         if date:
             event_details["date"] = date
             feedback_messages.append(f"Set for **{date}**. Great.")
@@ -128,19 +183,8 @@ def get_next_question(event_details):
         return "When is the event? (e.g., 'next Saturday', 'Dec 20th')"
     return None # All details are filled
 
-def run_chat():
-    """Main function to run the console chat."""
-    
-    event_details = {
-        "event_type": None,
-        "contestant_count": None,
-        "scoring": None,
-        "date": None
-    }
-    
-    print("Chat: Hello! I'm here to help you set up your event.")
-    print("Chat: You can tell me all the details at once, or I can ask you.")
-    
+def collect_details(event_details):
+    """Asks for whatever is still missing until every detail is filled."""
     while True:
         next_question = get_next_question(event_details)
         
@@ -163,27 +207,95 @@ def run_chat():
         elif next_question:
             print("Chat: Sorry, I didn't quite catch that.")
 
-    # --- Verification Step ---
+def print_summary(event_details):
+    """Shows the collected details so the user can confirm them."""
     print("\n--- Event Summary ---")
     print(f"Event Type:        {event_details['event_type']}")
     print(f"Contestant Count:  {event_details['contestant_count']}")
     print(f"Scoring Method:    {event_details['scoring']}")
     print(f"Date:              {event_details['date']}")
     print("----------------------")
+
+def run_chat(registrar=None, calendar=None):
+    """
+    Main function to run the console chat.
+    Confirmed events are handed to `registrar` (a RegistrationWriter), if given.
+    `calendar` (an EventCalendar) is used to check for clashes before registering.
+    """
+    
+    event_details = {
+        "event_type": None,
+        "contestant_count": None,
+        "scoring": None,
+        "date": None
+    }
+    
+    print("Chat: Hello! I'm here to help you set up your event.")
+    print("Chat: You can tell me all the details at once, or I can ask you.")
+    
+    collect_details(event_details)
+
+    # --- Verification Step ---
+    print_summary(event_details)
     
     while True:
         print("Chat: Does this look correct? (yes / no / edit)")
         confirm = input("You: ").lower().strip()
         
         if confirm == "yes":
+            too_big = (calendar is not None and calendar.daily_capacity is not None
+                       and (event_details['contestant_count'] or 0) > calendar.daily_capacity)
+            if too_big:
+                # No day could ever fit this event, so ask for fewer contestants
+                print(f"Chat: Sorry, at most {calendar.daily_capacity} contestants "
+                      f"can compete on one day.")
+                print("Chat: Let's go with a smaller number of contestants.")
+                event_details['contestant_count'] = None
+                collect_details(event_details)
+                print_summary(event_details)
+                continue
+
+            if calendar is not None and not calendar.has_capacity(event_details):
+                # Only the date is the problem, so keep everything else
+                places_left = max(0, calendar.daily_capacity - calendar.contestants_on(event_details['date']))
+                print(f"Chat: Sorry, {event_details['date']} is full. "
+                      f"Only {places_left} contestant places are left that day.")
+                print("Chat: Let's pick a different date.")
+                event_details['date'] = None
+                collect_details(event_details)
+                print_summary(event_details)
+                continue
+
+            if calendar is not None:
+                clashes = calendar.conflicts(event_details['event_type'], event_details['date'])
+                if clashes:
+                    print(f"Chat: Heads up: {clashes} other {event_details['event_type']} "
+                          f"event(s) are already registered on {event_details['date']}.")
+
+            # Store first: if that fails, the calendar must not count the event
+            if registrar is not None:
+                try:
+                    registrar.submit(event_details, timeout=SUBMIT_TIMEOUT)
+                    registrar.flush()
+                except (RuntimeError, queue.Full) as e:
+                    print("Chat: Sorry, your event could not be saved, so it is not registered.")
+                    print(f"Chat: ({str(e) or 'the registration queue is full'}) Please try again later.")
+                    break
+            if calendar is not None:
+                calendar.add(event_details)
             print("Chat: Great! Your event has been registered.")
             break
         elif confirm in ["no", "edit"]:
             print("Chat: Okay, let's start over.")
-            run_chat() # Restart
+            run_chat(registrar, calendar) # Restart
             break
         else:
             print("Chat: Please answer 'yes' or 'no'.")
 
 if __name__ == "__main__":
-    run_chat()
\ No newline at end of file
+    registrar = RegistrationWriter()
+    calendar = EventCalendar.from_store(daily_capacity=DAILY_CONTESTANT_CAPACITY)
+    try:
+        run_chat(registrar, calendar)
+    finally:
+        registrar.close() # Write anything still queued
\ No newline at end of file
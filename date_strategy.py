@@ -0,0 +1,235 @@
+# date_strategy.py
+"""
+Learns which date-parsing strategy to try first for each kind of phrase.
+
+V3 tries dateparser.parse() before search_dates() on every DATE entity,
+no matter which one usually works. A DateStrategyScheduler sorts date
+phrases into coarse "shapes" (does it have a number, a month name,
+"next", ...), keeps success/latency counts per shape and strategy, and
+orders the strategies by expected cost: mean time / success rate.
+
+Trying another strategy first only gives the same answer if the two don't
+find *different* dates for the phrase ("10th": parse() says the 29th,
+search_dates() the 10th). Phrases with a number disagree far more often
+than others ("1st of jan", "next month on the 3rd"), so shapes with a
+number always keep the default order. For the other shapes, while a shape
+is being learned, and on every EXPLORE_EVERY-th call after that, the
+caller runs every strategy in the default order, keeps the default
+answer, and reports whether the dates found agreed. A shape is only
+reordered once it has MIN_TRIES such comparisons and none disagreed; one
+disagreement pins it to the default order for good.
+
+This is per shape, not per phrase, so it lowers the risk without removing
+it: a phrase that disagrees in a shape that has only agreed so far (e.g.
+"the day after tomorrow" in "unit+relative") gets the reordered answer,
+and the shape is pinned only after a later comparison sees it. With a
+scheduler, a date can therefore differ from a run without one.
+
+Only strategies that read the same text belong here. V2's keyword-window
+fallback searches the uncleaned message and keeps all-digit hits, so it
+always stays behind V2's main search and V2 doesn't use a scheduler.
+
+The table is saved as JSON, so what was learned survives restarts.
+Pass a scheduler to Extractor(date_scheduler=...) to turn this on; without
+one, the default order is always used.
+"""
+
+import os
+import re
+import json
+import tempfile
+import threading
+
+# Word classes used to build a phrase's shape
+SHAPE_CLASSES = (
+    ("number", re.compile(r"\d")),
+    ("month", re.compile(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b")),
+    ("weekday", re.compile(r"\b(mon|tue|wed|thu|fri|sat|sun)[a-z]*\b")),
+    ("unit", re.compile(r"\b(day|week|weekend|fortnight|month|year)s?\b")),
+    ("relative", re.compile(r"\b(next|this|last|in|ago|after|before|from|tomorrow|today|yesterday)\b")),
+    ("holiday", re.compile(r"christmas|easter|new year|halloween")),
+)
+
+# Shapes containing any of these classes are never reordered
+FIXED_ORDER_CLASSES = ("number",)
+
+# Comparisons (and tries per strategy) needed per shape before it is reordered
+MIN_TRIES = 5
+# Every Nth call for a trusted shape runs all strategies again, to keep checking they agree
+EXPLORE_EVERY = 20
+# Save in the background after this many new results (0 = only on save())
+AUTOSAVE_EVERY = 200
+
+
+def phrase_shape(text):
+    """'next Saturday' -> 'weekday+relative'. Empty phrases get 'other'."""
+    text = text.lower()
+    shape = [name for name, pattern in SHAPE_CLASSES if pattern.search(text)]
+    return "+".join(shape) or "other"
+
+
+def _new_entry():
+    # "compared": calls where every strategy ran; "disagreed": of those, how
+    # many found different dates
+    return {"strategies": {}, "compared": 0, "disagreed": 0}
+
+
+def _read_count(count):
+    if not isinstance(count, dict):
+        return None
+    try:
+        return {"tries": int(count["tries"]), "successes": int(count["successes"]),
+                "seconds": float(count["seconds"])}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def load_table(data):
+    """
+    Checks a table read from JSON and returns it in the current layout.
+    Older tables (shape -> strategy -> counts, no comparisons) keep their
+    counts but start with no comparisons, so agreement is learned again.
+    Entries that can't be read are dropped.
+    """
+    table = {}
+    if not isinstance(data, dict):
+        return table
+    for shape, entry in data.items():
+        if not isinstance(entry, dict):
+            continue
+        if "strategies" in entry:
+            counts, compared, disagreed = entry["strategies"], entry.get("compared"), entry.get("disagreed")
+        else:
+            counts, compared, disagreed = entry, 0, 0
+        if not isinstance(counts, dict) or not isinstance(compared, int) or not isinstance(disagreed, int):
+            continue
+        strategies = {name: _read_count(count) for name, count in counts.items()}
+        table[shape] = {
+            "strategies": {name: count for name, count in strategies.items() if count is not None},
+            "compared": compared,
+            "disagreed": disagreed,
+        }
+    return table
+
+
+class DateStrategyScheduler:
+    """
+    Success and latency table per (shape, strategy), shared by all threads.
+    """
+
+    def __init__(self, path=None, autosave_every=AUTOSAVE_EVERY):
+        self.path = path
+        self.autosave_every = autosave_every
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer at a time, newest snapshot wins
+        self._table = {}  # shape -> {"strategies": {name: counts}, "compared", "disagreed"}
+        self._calls = {}  # shape -> number of plan() calls (for exploring)
+        self._unsaved = 0
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._table = load_table(json.load(f))
+
+    def shape(self, text):
+        return phrase_shape(text)
+
+    def plan(self, shape, strategies):
+        """
+        Returns (strategy names in the order to try, compare).
+
+        When compare is True the names are in the given (default) order and
+        the caller should run all of them, answer with the first success,
+        and pass the dates found to record_comparison().
+        """
+        strategies = list(strategies)
+        if any(name in FIXED_ORDER_CLASSES for name in shape.split("+")):
+            return strategies, False
+        with self._lock:
+            calls = self._calls[shape] = self._calls.get(shape, 0) + 1
+            entry = self._table.get(shape)
+            if not self._trusted(entry, strategies):
+                return strategies, True
+            counts = entry["strategies"]
+            ranked = sorted(strategies, key=lambda name: self._expected_cost(counts[name]))
+
+        if calls % EXPLORE_EVERY == 0:
+            return strategies, True
+        return ranked, False
+
+    @staticmethod
+    def _trusted(entry, strategies):
+        if entry is None or entry["disagreed"] or entry["compared"] < MIN_TRIES:
+            return False
+        counts = entry["strategies"]
+        return all(counts.get(name, {}).get("tries", 0) >= MIN_TRIES for name in strategies)
+
+    @staticmethod
+    def _expected_cost(count):
+        # Laplace-smoothed success rate, so one lucky try doesn't win outright
+        success_rate = (count["successes"] + 1) / (count["tries"] + 2)
+        mean_seconds = count["seconds"] / count["tries"]
+        return mean_seconds / success_rate
+
+    def record(self, shape, strategy, success, seconds):
+        """Adds one attempt's outcome to the table."""
+        with self._lock:
+            entry = self._table.setdefault(shape, _new_entry())
+            count = entry["strategies"].setdefault(
+                strategy, {"tries": 0, "successes": 0, "seconds": 0.0}
+            )
+            count["tries"] += 1
+            count["successes"] += int(bool(success))
+            count["seconds"] += seconds
+            self._count_unsaved()
+
+    def record_comparison(self, shape, found_dates):
+        """
+        Adds the dates found by every strategy that succeeded on one phrase.
+        Different dates mean the order matters, so the shape stays unordered.
+        """
+        with self._lock:
+            entry = self._table.setdefault(shape, _new_entry())
+            entry["compared"] += 1
+            entry["disagreed"] += int(len(set(found_dates)) > 1)
+            self._count_unsaved()
+
+    def _count_unsaved(self):
+        # Called with self._lock held. The file is written on another
+        # thread, so a date lookup never waits for the disk.
+        self._unsaved += 1
+        if self.path and self.autosave_every and self._unsaved >= self.autosave_every:
+            self._unsaved = 0
+            threading.Thread(target=self._autosave, name="date-strategy-save", daemon=True).start()
+
+    def _autosave(self):
+        # If a save is already running, skip: the next batch will trigger another
+        if self._save_lock.acquire(blocking=False):
+            try:
+                self._write()
+            finally:
+                self._save_lock.release()
+
+    def snapshot(self):
+        """A copy of the learned table."""
+        with self._lock:
+            return json.loads(json.dumps(self._table))
+
+    def save(self):
+        """Writes the table to `path` (atomically, so a crash can't leave half a file)."""
+        if not self.path:
+            return
+        with self._save_lock:
+            self._write()
+
+    def _write(self):
+        with self._lock:
+            data = json.dumps(self._table, indent=1, sort_keys=True)
+            self._unsaved = 0
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".date_strategy_", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
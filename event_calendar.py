@@ -0,0 +1,104 @@
+# event_calendar.py
+"""
+In-memory calendar of registered events, used at confirmation time to
+warn about same-type events on the same day and to enforce a daily
+contestant capacity.
+
+Dates are stored as day ordinals (date.toordinal()) in one sorted array
+per event type, so conflict counts are two binary searches. Contestant
+totals per day are kept in a dict, so capacity checks don't depend on
+how many events are registered.
+"""
+
+import bisect
+from array import array
+from datetime import date
+
+from registration import DEFAULT_DB_PATH, connect
+
+
+def to_ordinal(date_text):
+    """'2025-11-01' -> day ordinal, or None if the date is missing/invalid."""
+    if not date_text:
+        return None
+    try:
+        return date.fromisoformat(date_text).toordinal()
+    except ValueError:
+        return None
+
+
+class EventCalendar:
+    """
+    Registered events indexed by date.
+    daily_capacity is the max contestants across all events on one day (None = no limit).
+    """
+
+    def __init__(self, daily_capacity=None):
+        self.daily_capacity = daily_capacity
+        self._by_type = {}  # event_type -> sorted array of day ordinals
+        self._contestants = {}  # day ordinal -> total contestants that day
+        self.size = 0
+
+    @classmethod
+    def from_events(cls, events, daily_capacity=None):
+        """Builds a calendar from (event_type, date, contestant_count) rows."""
+        calendar = cls(daily_capacity)
+        ordinals_by_type = {}
+        for event_type, date_text, contestant_count in events:
+            ordinal = to_ordinal(date_text)
+            if ordinal is None:
+                continue
+            ordinals_by_type.setdefault(event_type, []).append(ordinal)
+            calendar._contestants[ordinal] = calendar._contestants.get(ordinal, 0) + (contestant_count or 0)
+            calendar.size += 1
+
+        # Sort once, instead of inserting one by one
+        for event_type, ordinals in ordinals_by_type.items():
+            ordinals.sort()
+            calendar._by_type[event_type] = array('l', ordinals)
+        return calendar
+
+    @classmethod
+    def from_store(cls, db_path=DEFAULT_DB_PATH, daily_capacity=None):
+        """Loads every event in the registration store."""
+        conn = connect(db_path)
+        try:
+            rows = conn.execute("SELECT event_type, date, contestant_count FROM events")
+            return cls.from_events(rows, daily_capacity)
+        finally:
+            conn.close()
+
+    def add(self, event_details):
+        """Adds a newly registered event."""
+        ordinal = to_ordinal(event_details["date"])
+        if ordinal is None:
+            return
+        ordinals = self._by_type.setdefault(event_details["event_type"], array('l'))
+        bisect.insort(ordinals, ordinal)
+        self._contestants[ordinal] = self._contestants.get(ordinal, 0) + (event_details["contestant_count"] or 0)
+        self.size += 1
+
+    # --- Queries ---
+
+    def count_between(self, event_type, start_date, end_date):
+        """Number of events of a type from start_date to end_date (inclusive)."""
+        ordinals = self._by_type.get(event_type)
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+        if not ordinals or start is None or end is None:
+            return 0
+        return bisect.bisect_right(ordinals, end) - bisect.bisect_left(ordinals, start)
+
+    def conflicts(self, event_type, date_text):
+        """Number of events of the same type already on that day."""
+        return self.count_between(event_type, date_text, date_text)
+
+    def contestants_on(self, date_text):
+        """Total contestants already registered on that day."""
+        return self._contestants.get(to_ordinal(date_text), 0)
+
+    def has_capacity(self, event_details):
+        """False if this event would push its day over daily_capacity."""
+        if self.daily_capacity is None or to_ordinal(event_details["date"]) is None:
+            return True
+        total = self.contestants_on(event_details["date"]) + (event_details["contestant_count"] or 0)
+        return total <= self.daily_capacity
@@ -0,0 +1,98 @@
+# incremental.py
+"""
+Incremental slot extraction for live-typing previews.
+
+Wraps a loaded chat_logic module (or one of its Extractor objects) and
+keeps per-buffer state, so calling it on every keystroke skips the date
+extractor (the expensive dateparser / spaCy part) whenever it can without
+changing the answer.
+
+Dates are always looked up on the whole buffer, never sentence by
+sentence: dateparser and spaCy read the message as a whole (V2 runs its
+main search over all of it before the fallback, spaCy's entities depend on
+the words around them, and even V1 finds "M" in "Judges. M" only in
+context), so reusing per-sentence results would differ from a full run.
+"""
+
+from collections import OrderedDict
+
+SLOTS = ("event_type", "contestant_count", "scoring", "date")
+
+# How many recent buffers' dates are remembered (for deletes, undo, retyping)
+DATE_CACHE_SIZE = 256
+
+
+class IncrementalBuffer:
+    """
+    Holds the text a user is typing and the extraction results for it.
+
+    Every slot is extracted from the full buffer, so the preview always
+    matches a full run on the same text. The cheap regex extractors are
+    simply re-run. The date extractor is skipped when the version's
+    prefilter rules the buffer out, and its results are cached on the
+    buffer text, so going back to an earlier text costs nothing.
+    """
+
+    def __init__(self, chat_module, text="", now=None):
+        # Anything with the extract_* functions works here, e.g. a
+        # chat_logic module or an Extractor(debug=False) from one.
+        self.chat_module = chat_module
+        # Reference date for relative dates. Cached dates depend on it,
+        # so it is fixed for the lifetime of the buffer.
+        self.now = now
+        self.text = None
+        self._date_cache = OrderedDict()  # buffer text -> date
+        self._preview = dict.fromkeys(SLOTS)
+        self.date_calls = 0  # How many times the date extractor really ran
+        self.set_text(text)
+
+    def append(self, chars):
+        """Adds typed characters to the end of the buffer."""
+        return self.set_text(self.text + chars)
+
+    def set_text(self, text):
+        """
+        Replaces the buffer (for edits, deletes, pastes) and returns the
+        updated slot preview.
+        """
+        if text == self.text:
+            return self.preview()
+        self.text = text
+
+        module = self.chat_module
+        # Normalize the buffer once for the regex extractors, if the version supports it
+        message = module.Message(text) if hasattr(module, "Message") else text
+        self._preview["event_type"] = module.extract_event_type(message)
+        self._preview["contestant_count"] = module.extract_contestant_count(message)
+        self._preview["scoring"] = module.extract_scoring(message)
+        self._preview["date"] = self._extract_date(text)
+        return self.preview()
+
+    def preview(self):
+        """Returns a copy of the slots found in the current buffer."""
+        return dict(self._preview)
+
+    def apply(self, event_details):
+        """Fills any still-missing slots in event_details from the buffer."""
+        for slot in SLOTS:
+            if event_details[slot] is None:
+                event_details[slot] = self._preview[slot]
+        return event_details
+
+    def _extract_date(self, text):
+        # Versions with a date prefilter let us skip buffers like "12 people."
+        may_contain_date = getattr(self.chat_module, "may_contain_date", None)
+        if may_contain_date is not None and not may_contain_date(text):
+            return None
+
+        cache = self._date_cache
+        if text in cache:
+            cache.move_to_end(text)
+            return cache[text]
+
+        found = self.chat_module.extract_date(text, self.now)
+        self.date_calls += 1
+        cache[text] = found
+        if len(cache) > DATE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return found
@@ -0,0 +1,190 @@
+# registration.py
+"""
+Stores confirmed events in a local SQLite database.
+
+Confirmations go into a bounded queue and a single writer thread commits
+them in groups, so thousands of events per second cost a handful of
+commits instead of one fsync each. When the queue is full, submit()
+blocks (or raises queue.Full after `timeout`) until the writer catches up.
+
+If the store fails, the writer keeps emptying the queue (so nobody stays
+blocked) but drops what it takes, and every later submit(), flush() and
+close() raises with the original error.
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "events.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    event_type TEXT,
+    contestant_count INTEGER,
+    scoring TEXT,
+    date TEXT,
+    registered_at TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (date, event_type);
+"""
+
+INSERT_EVENT = """
+INSERT INTO events (event_type, contestant_count, scoring, date, registered_at)
+VALUES (:event_type, :contestant_count, :scoring, :date, :registered_at)
+"""
+
+_STOP = object()  # Tells the writer thread to finish up
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """
+    Opens the store and makes sure the table exists.
+    WAL + synchronous=NORMAL means commits don't wait for an fsync
+    (a crash can lose the last few commits, but never corrupts the file).
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class RegistrationWriter:
+    """
+    Batching writer for confirmed events.
+
+    submit() is safe to call from many threads. flush() waits for what has
+    been submitted so far. close() (or leaving a `with` block) writes
+    everything still queued before returning.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, batch_size=500, max_queue=10000, flush_interval=0.05):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        # How long to wait for more events before committing a small batch
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.commits = 0
+        self.dropped = 0  # events taken off the queue after the store failed
+        self.error = None
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Guards _closed and counts submits still putting into the queue,
+        # so close() never puts _STOP in front of one of them
+        self._state = threading.Condition()
+        self._closed = False
+        self._submitting = 0
+        # Open (and create) the store here, so a bad path fails right away
+        connect(db_path).close()
+        self._thread = threading.Thread(target=self._run, name="registration-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, event_details, timeout=None):
+        """
+        Queues a copy of a confirmed event for writing.
+        Blocks while the queue is full; raises queue.Full if `timeout` runs out.
+        Raises RuntimeError if the writer is closed or the store has failed.
+        """
+        with self._state:
+            if self._closed:
+                raise RuntimeError("RegistrationWriter is closed.")
+            self._raise_if_failed()
+            self._submitting += 1
+        record = {
+            "event_type": event_details["event_type"],
+            "contestant_count": event_details["contestant_count"],
+            "scoring": event_details["scoring"],
+            "date": event_details["date"],
+            "registered_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        try:
+            self._queue.put(record, timeout=timeout)
+        finally:
+            with self._state:
+                self._submitting -= 1
+                self._state.notify_all()
+        # The store may have failed while this call was waiting for room
+        self._raise_if_failed()
+
+    def flush(self):
+        """
+        Waits until every event submitted so far has been committed.
+        Raises RuntimeError if the store failed.
+        """
+        self._queue.join()
+        self._raise_if_failed()
+
+    def close(self):
+        """Writes what is left in the queue and stops the writer thread."""
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            while self._submitting:
+                self._state.wait()
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self):
+        if self.error is not None:
+            raise RuntimeError(f"Registration store failed: {self.error!r}") from self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Writer Thread ---
+
+    def _run(self):
+        # Any failure (even opening the store) is kept in self.error and the
+        # loop goes on draining the queue, so submit() and flush() never hang.
+        conn = None
+        try:
+            conn = connect(self.db_path)
+        except Exception as e:
+            self.error = e
+        try:
+            stopping = False
+            while not stopping:
+                batch = [self._queue.get()]
+
+                # Group commit: keep collecting until the batch is full
+                # or the queue has been quiet for flush_interval.
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            batch.append(self._queue.get(timeout=remaining))
+                        else:
+                            batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                records = [item for item in batch if item is not _STOP]
+                stopping = len(records) != len(batch)
+                try:
+                    if records and self.error is None:
+                        with conn:
+                            conn.executemany(INSERT_EVENT, records)
+                        self.written += len(records)
+                        self.commits += 1
+                    else:
+                        self.dropped += len(records)
+                except Exception as e:
+                    self.error = e
+                    self.dropped += len(records)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            if conn is not None:
+                conn.close()
@@ -0,0 +1,128 @@
+# registry.py
+"""
+Finds the chat logic version folders (V1. ..., V2. ..., etc.) and keeps
+each loaded 'chat_logic.py' module cached.
+
+A cached module is only re-executed when its source file changes on disk.
+A reload builds a *new* module object and swaps it into the cache, so code
+still running on the old module (or an Extractor made from it) is not
+changed underneath. The only things carried over are the names the module
+lists in RELOAD_KEEP, e.g. V3's spaCy model, so they aren't loaded again.
+Everything else (DEBUG, PREFILTER_STATS, ...) starts fresh in the new module.
+"""
+
+import os
+import re
+import threading
+import importlib.util
+
+LOGIC_FILE = "chat_logic.py"
+
+# "V3. NLP + spacy" -> "3"
+VERSION_FOLDER_PATTERN = re.compile(r"^V(\d+)\.")
+
+DEFAULT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def discover_versions(root=DEFAULT_ROOT):
+    """
+    Returns {"1": "V1. NLP", "2": ...} for every version folder under root
+    that has a chat_logic.py, ordered by version number.
+    """
+    versions = {}
+    for name in os.listdir(root):
+        match = VERSION_FOLDER_PATTERN.match(name)
+        if match and os.path.isfile(os.path.join(root, name, LOGIC_FILE)):
+            versions[match.group(1)] = name
+    return dict(sorted(versions.items(), key=lambda item: int(item[0])))
+
+
+def module_name_for(version_name):
+    """Unique module name per version, to avoid import cache conflicts."""
+    return f"chat_logic_{version_name.replace(' ', '_').replace('+', '').lower()}"
+
+
+def load_module_from_path(folder_path, version_name, carry_over=None):
+    """
+    Dynamically loads the 'chat_logic.py' module from a given folder.
+    Always executes the file; use VersionRegistry to get a cached module.
+    `carry_over` is a dict of names set in the module before its code runs.
+    """
+    file_path = os.path.join(folder_path, LOGIC_FILE)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Error: '{LOGIC_FILE}' not found in folder '{folder_path}'")
+
+    spec = importlib.util.spec_from_file_location(module_name_for(version_name), file_path)
+    if spec is None:
+        raise ImportError(f"Could not create import spec for {file_path}")
+
+    chat_module = importlib.util.module_from_spec(spec)
+    for name, value in (carry_over or {}).items():
+        setattr(chat_module, name, value)
+
+    spec.loader.exec_module(chat_module)
+
+    return chat_module
+
+
+def _source_stamp(file_path):
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class VersionRegistry:
+    """
+    Cache of loaded chat_logic modules, keyed by version folder name.
+
+    get() loads a version the first time it is asked for, and after that
+    only reloads it when chat_logic.py has been modified. Safe to call
+    from several threads; a reload returns a new module and leaves the old
+    one as it was for anyone still using it.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._modules = {}  # folder name -> (module, source stamp)
+        self._lock = threading.Lock()
+
+    def versions(self):
+        """Rescans the root folder. New version folders show up here."""
+        return discover_versions(self.root)
+
+    def resolve(self, version):
+        """Accepts a version number ("3") or a folder name ("V3. NLP + spacy")."""
+        versions = self.versions()
+        if version in versions:
+            return versions[version]
+        if version in versions.values():
+            return version
+        raise KeyError(f"Unknown logic version: '{version}'")
+
+    def get(self, version):
+        """Returns the loaded module for a version, reloading it if its source changed."""
+        folder_name = self.resolve(version)
+        folder_path = os.path.join(self.root, folder_name)
+        stamp = _source_stamp(os.path.join(folder_path, LOGIC_FILE))
+
+        with self._lock:
+            cached = self._modules.get(folder_name)
+            if cached is None:
+                chat_module = load_module_from_path(folder_path, folder_name)
+            elif cached[1] != stamp:
+                old_module = cached[0]
+                keep = {name: getattr(old_module, name)
+                        for name in getattr(old_module, "RELOAD_KEEP", ())
+                        if hasattr(old_module, name)}
+                # If the new source fails, the old module and stamp stay
+                # cached, so the next get() tries again.
+                chat_module = load_module_from_path(folder_path, folder_name, keep)
+            else:
+                return cached[0]
+
+            self._modules[folder_name] = (chat_module, stamp)
+            return chat_module
+
+    def loaded(self):
+        """Folder names of the versions currently cached."""
+        with self._lock:
+            return list(self._modules)
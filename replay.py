@@ -0,0 +1,312 @@
+# replay.py
+"""
+Replays recorded chat transcripts against the dialogue logic, to check
+capacity before a release.
+
+Transcripts are JSONL, one session per line:
+    {"session_id": "abc", "turns": ["bmx event", "12 people", "next friday"]}
+Lines without "turns" are replayed as a one-turn session of their "body",
+named by "request_id", so a file like requests.jsonl also works.
+
+Turn latency is counted from when the turn was due (a session's first turn
+is due at its scheduled start), so time spent waiting for a free slot
+under overload shows up in the numbers. That wait is also reported on
+its own as the queue wait.
+
+Example:
+    python replay.py sessions.jsonl --versions 1 3 --concurrency 8 --rate 20
+"""
+
+import sys
+import json
+import time
+import traceback
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from registry import VersionRegistry
+from date_strategy import DateStrategyScheduler
+from router import SessionRouter, new_event_details
+
+SLOTS = ("event_type", "contestant_count", "scoring", "date")
+
+# Latency histogram bucket upper bounds, in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+# --- Transcripts ---
+
+def load_transcripts(path):
+    """Reads a JSONL file into a list of (session_id, [turns])."""
+    transcripts = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            session_id = record.get("session_id") or record.get("request_id") or f"line-{line_number}"
+            turns = record.get("turns")
+            if turns is None:
+                turns = [record["body"]] if "body" in record else []
+            if turns:
+                transcripts.append((str(session_id), [str(turn) for turn in turns]))
+    return transcripts
+
+
+# --- Stats ---
+
+class ReplayStats:
+    """Collects turn latencies and slot-fill outcomes from many threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []  # seconds per turn, from when the turn was due
+        self.queue_waits = []  # seconds each session waited past its scheduled start
+        self.sessions = 0
+        self.completed = 0  # sessions where every slot got filled
+        self.slot_fills = dict.fromkeys(SLOTS, 0)
+        self.errors = 0
+        self.first_error = None  # (session_id, traceback text)
+
+    def add_turn(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def add_queue_wait(self, seconds):
+        with self._lock:
+            self.queue_waits.append(seconds)
+
+    def add_session(self, event_details):
+        with self._lock:
+            self.sessions += 1
+            filled = [slot for slot in SLOTS if event_details.get(slot) is not None]
+            for slot in filled:
+                self.slot_fills[slot] += 1
+            if len(filled) == len(SLOTS):
+                self.completed += 1
+
+    def add_error(self, session_id, error_text):
+        with self._lock:
+            self.errors += 1
+            if self.first_error is None:
+                self.first_error = (session_id, error_text)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def histogram(latencies):
+    """Counts per bucket, as [(label, count)]."""
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for seconds in latencies:
+        ms = seconds * 1000
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if ms <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+
+    labels = [f"<= {bound} ms" for bound in HISTOGRAM_BUCKETS_MS]
+    labels.append(f"> {HISTOGRAM_BUCKETS_MS[-1]} ms")
+    return list(zip(labels, counts))
+
+
+def print_report(version_name, stats, wall_seconds):
+    latencies = sorted(stats.latencies)
+    turns = len(latencies)
+
+    print(f"\n--- 📈 Replay Report for: {version_name} ---")
+    print(f"Sessions:          {stats.sessions}  (errors: {stats.errors})")
+    print(f"Turns:             {turns}")
+    print(f"Wall time:         {wall_seconds:.2f} s")
+    if wall_seconds > 0:
+        print(f"Throughput:        {turns / wall_seconds:.1f} turns/s, {stats.sessions / wall_seconds:.1f} sessions/s")
+    if turns:
+        print(f"Latency (ms):      mean {1000 * sum(latencies) / turns:.1f}"
+              f" | p50 {1000 * percentile(latencies, 0.50):.1f}"
+              f" | p90 {1000 * percentile(latencies, 0.90):.1f}"
+              f" | p99 {1000 * percentile(latencies, 0.99):.1f}"
+              f" | max {1000 * latencies[-1]:.1f}")
+    if stats.queue_waits:
+        waits = sorted(stats.queue_waits)
+        print(f"Queue wait (ms):   mean {1000 * sum(waits) / len(waits):.1f}"
+              f" | p50 {1000 * percentile(waits, 0.50):.1f}"
+              f" | p99 {1000 * percentile(waits, 0.99):.1f}"
+              f" | max {1000 * waits[-1]:.1f}")
+
+    if turns:
+        print("\nTurn latency histogram:")
+        buckets = histogram(latencies)
+        widest = max(count for _, count in buckets) or 1
+        for label, count in buckets:
+            bar = "#" * round(40 * count / widest)
+            print(f"  {label:>11} | {count:>7} {bar}")
+
+    if stats.sessions:
+        print("\nSlot-fill outcomes:")
+        print(f"  all slots filled: {stats.completed}/{stats.sessions} ({100 * stats.completed / stats.sessions:.1f}%)")
+        for slot in SLOTS:
+            filled = stats.slot_fills[slot]
+            print(f"  {slot:<17} {filled}/{stats.sessions} ({100 * filled / stats.sessions:.1f}%)")
+
+    if stats.first_error is not None:
+        session_id, error_text = stats.first_error
+        print(f"\nFirst error (session '{session_id}'):")
+        print(error_text.rstrip())
+    print("-" * 50)
+
+
+# --- Replay ---
+
+def replay(transcripts, run_turn, concurrency=1, rate=None, end_session=None):
+    """
+    Replays every transcript and returns (stats, wall_seconds).
+
+    run_turn(session_id, text, event_details) runs one turn and returns the
+    updated event_details. Sessions start `rate` per second (or all at once
+    when rate is None), and at most `concurrency` run at the same time.
+    A session stops early once every slot is filled, as run_chat would,
+    and end_session(session_id) (if given) is called when it finishes.
+    """
+    stats = ReplayStats()
+    started = time.perf_counter()
+
+    def run_session(index, session_id, turns):
+        scheduled = started + index / rate if rate else started
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        stats.add_queue_wait(max(0.0, time.perf_counter() - scheduled))
+
+        event_details = new_event_details()
+        try:
+            # The first turn is due at the scheduled start, each later
+            # turn as soon as the previous one has been answered.
+            due = scheduled
+            for text in turns:
+                event_details = run_turn(session_id, text, event_details)
+                answered = time.perf_counter()
+                stats.add_turn(answered - due)
+                due = answered
+                if all(event_details[slot] is not None for slot in SLOTS):
+                    break
+        except Exception:
+            stats.add_error(session_id, traceback.format_exc())
+        finally:
+            if end_session is not None:
+                try:
+                    end_session(session_id)
+                except Exception:
+                    stats.add_error(session_id, traceback.format_exc())
+        stats.add_session(event_details)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, (session_id, turns) in enumerate(transcripts):
+            pool.submit(run_session, index, session_id, turns)
+
+    return stats, time.perf_counter() - started
+
+
+def in_process_runner(extractor, now):
+    """Runs turns on one shared Extractor in this process."""
+    def run_turn(session_id, text, event_details):
+        extractor.update_details_and_get_feedback(text, event_details, now)
+        return event_details
+
+    return run_turn
+
+
+def router_runner(router, run_id, now):
+    """
+    Runs turns through a SessionRouter (one process per worker).
+    Returns (run_turn, end_session).
+    """
+    def run_turn(session_id, text, event_details):
+        _, event_details, _ = router.handle(f"{run_id}:{session_id}", text, now)
+        return event_details
+
+    def end_session(session_id):
+        router.end_session(f"{run_id}:{session_id}")
+
+    return run_turn, end_session
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay chat transcripts and report latency.")
+    parser.add_argument("transcripts", help="JSONL file, one session per line")
+    parser.add_argument("--versions", nargs="+", help="Version numbers to test (default: all)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Sessions running at once")
+    parser.add_argument("--rate", type=float, help="New sessions per second (default: all at once)")
+    parser.add_argument("--workers", type=int,
+                        help="Run turns through a SessionRouter with this many processes")
+    parser.add_argument("--now", default="2025-10-29",
+                        help="Reference date for relative dates, YYYY-MM-DD")
+    parser.add_argument("--date-table",
+                        help="JSON file for adaptive date-strategy ordering (loaded and saved; "
+                             "V3 only, not with --workers; can change a few dates)")
+    args = parser.parse_args(argv)
+
+    transcripts = load_transcripts(args.transcripts)
+    if not transcripts:
+        print("No transcripts found.")
+        return 1
+    now = datetime.fromisoformat(args.now)
+    scheduler = DateStrategyScheduler(args.date_table) if args.date_table else None
+    if scheduler is not None and args.workers:
+        # Worker processes build their own Extractors, so they can't share the table
+        print("Note: --date-table only applies to in-process runs; ignored with --workers.")
+        scheduler = None
+
+    registry = VersionRegistry()
+    versions = registry.versions()
+    selected = args.versions or list(versions)
+
+    for choice in selected:
+        if choice not in versions:
+            print(f"Unknown version '{choice}'. Available: {', '.join(versions)}")
+            return 1
+        version_name = versions[choice]
+        print(f"\nReplaying {len(transcripts)} sessions against '{version_name}'...")
+
+        if args.workers:
+            with SessionRouter(workers=args.workers, version=choice) as router:
+                run_turn, end_session = router_runner(router, choice, now)
+                stats, wall_seconds = replay(
+                    transcripts, run_turn,
+                    concurrency=args.concurrency, rate=args.rate, end_session=end_session
+                )
+                print("Worker load:", router.load())
+        else:
+            chat_module = registry.get(choice)
+            if not hasattr(chat_module, 'Extractor'):
+                extractor = chat_module
+            elif scheduler is not None and hasattr(chat_module, 'DATE_STRATEGY_ORDER'):
+                # Only versions with interchangeable date strategies (V3) use the scheduler
+                extractor = chat_module.Extractor(debug=False, date_scheduler=scheduler)
+            else:
+                extractor = chat_module.Extractor(debug=False)
+            stats, wall_seconds = replay(
+                transcripts, in_process_runner(extractor, now),
+                concurrency=args.concurrency, rate=args.rate
+            )
+            if hasattr(extractor, 'prefilter_stats'):
+                prefilter = extractor.prefilter_stats.snapshot()
+                print(f"Date prefilter:    skipped {prefilter['skipped']}/{prefilter['checked']}"
+                      f" date lookups ({100 * prefilter['skip_rate']:.1f}%)")
+        print_report(version_name, stats, wall_seconds)
+
+    if scheduler is not None:
+        scheduler.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
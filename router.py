@@ -0,0 +1,338 @@
+# router.py
+"""
+Spreads chat sessions over several worker processes.
+
+dateparser and spaCy are CPU-bound, so one Python process only ever uses
+one core. The SessionRouter starts N workers, each with its own copy of a
+chat_logic version, and picks the worker for a session by consistent
+hashing on the session ID. A session always lands on the same worker
+(keeping that worker's caches warm), and changing the worker count only
+moves the sessions whose position on the hash ring changed.
+"""
+
+import os
+import time
+import bisect
+import hashlib
+import threading
+import multiprocessing
+
+from registry import DEFAULT_ROOT, VersionRegistry
+
+# Points per worker on the hash ring. More points = more even spread.
+VIRTUAL_NODES = 64
+
+
+def _hash(key):
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def new_event_details():
+    return {
+        "event_type": None,
+        "contestant_count": None,
+        "scoring": None,
+        "date": None
+    }
+
+
+# --- Consistent Hashing ---
+
+class HashRing:
+    """Maps keys to shards. Adding/removing a shard only moves ~1/N of the keys."""
+
+    def __init__(self, shards=(), virtual_nodes=VIRTUAL_NODES):
+        self.virtual_nodes = virtual_nodes
+        self._points = []  # sorted hashes
+        self._owners = {}  # hash -> shard
+        for shard in shards:
+            self.add(shard)
+
+    def add(self, shard):
+        for i in range(self.virtual_nodes):
+            point = _hash(f"{shard}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = shard
+
+    def remove(self, shard):
+        self._points = [point for point in self._points if self._owners[point] != shard]
+        self._owners = {point: self._owners[point] for point in self._points}
+
+    def shard_for(self, key):
+        if not self._points:
+            raise LookupError("Hash ring has no shards.")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+# --- Worker Process ---
+
+def _worker_main(conn, root, version):
+    """
+    Runs in the worker process. Keeps the event_details of its own sessions
+    and answers commands sent by the router over a pipe.
+    """
+    chat_module = VersionRegistry(root).get(version)
+    if hasattr(chat_module, 'Extractor'):
+        extractor = chat_module.Extractor(debug=False)
+    else:
+        extractor = chat_module
+    sessions = {}
+
+    while True:
+        command, payload = conn.recv()
+        try:
+            if command == "turn":
+                session_id, text, now = payload
+                event_details = sessions.setdefault(session_id, new_event_details())
+                feedback = extractor.update_details_and_get_feedback(text, event_details, now) or []
+                reply = (feedback, dict(event_details), extractor.get_next_question(event_details))
+            elif command == "export":
+                reply = {session_id: sessions.pop(session_id)
+                         for session_id in payload if session_id in sessions}
+            elif command == "import":
+                sessions.update(payload)
+                reply = None
+            elif command == "end":
+                reply = sessions.pop(payload, None)
+            elif command == "stop":
+                conn.send(("ok", None))
+                break
+            else:
+                raise ValueError(f"Unknown command: '{command}'")
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        else:
+            conn.send(("ok", reply))
+    conn.close()
+
+
+class _Shard:
+    """Router-side handle for one worker process."""
+
+    def __init__(self, shard_id, context, root, version):
+        self.shard_id = shard_id
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, root, version), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._lock = threading.Lock()  # one request at a time per pipe
+
+        # Load stats (updated under the router's lock)
+        self.sessions = 0
+        self.turns = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+
+    def call(self, command, payload=None):
+        with self._lock:
+            self.conn.send((command, payload))
+            status, reply = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(f"Worker {self.shard_id} failed on '{command}': {reply}")
+        return reply
+
+    def stop(self):
+        try:
+            self.call("stop")
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+# --- Router ---
+
+class SessionRouter:
+    """
+    Front router for chat turns.
+
+    handle() can be called from many threads at once. Turns for different
+    workers run in parallel; turns for the same worker are queued on its pipe.
+
+    Workers are started with "spawn", so scripts that create a router need
+    the usual `if __name__ == "__main__":` guard.
+    """
+
+    def __init__(self, workers=None, version=None, root=DEFAULT_ROOT):
+        versions = VersionRegistry(root).versions()
+        if version is None:
+            # Default to the newest logic version
+            version = list(versions)[-1]
+        self.version = version
+        self.root = root
+        self._context = multiprocessing.get_context("spawn")
+
+        self._shards = {}
+        self._ring = HashRing()
+        self._owners = {}  # session ID -> shard ID
+        self._next_shard_id = 0
+
+        # Turns wait while a resize is migrating sessions
+        self._cond = threading.Condition()
+        self._active = 0
+        self._resizing = False
+
+        self._add_shards(workers or os.cpu_count() or 1)
+
+    def _add_shards(self, count):
+        # Start the processes first, then publish them under the lock,
+        # so load() never sees the shard table change mid-iteration.
+        started = []
+        for _ in range(count):
+            shard_id = self._next_shard_id
+            self._next_shard_id += 1
+            started.append(_Shard(shard_id, self._context, self.root, self.version))
+        with self._cond:
+            for shard in started:
+                self._shards[shard.shard_id] = shard
+                self._ring.add(shard.shard_id)
+
+    # --- Chat Turns ---
+
+    def handle(self, session_id, text, now=None):
+        """
+        Runs one user message for a session on its worker.
+        `now` pins the reference date for relative dates (default: worker's clock).
+        Returns (feedback_messages, event_details, next_question).
+        """
+        with self._cond:
+            while self._resizing:
+                self._cond.wait()
+            shard_id = self._ring.shard_for(session_id)
+            shard = self._shards[shard_id]
+            if self._owners.get(session_id) is None:
+                self._owners[session_id] = shard_id
+                shard.sessions += 1
+            shard.in_flight += 1
+            self._active += 1
+
+        started = time.perf_counter()
+        try:
+            return shard.call("turn", (session_id, text, now))
+        finally:
+            with self._cond:
+                shard.in_flight -= 1
+                shard.turns += 1
+                shard.busy_seconds += time.perf_counter() - started
+                self._active -= 1
+                self._cond.notify_all()
+
+    def end_session(self, session_id):
+        """Forgets a session (e.g. once its event is registered)."""
+        # Counts as active like handle(), so a resize can't export or stop
+        # the worker while the session is being dropped.
+        with self._cond:
+            while self._resizing:
+                self._cond.wait()
+            shard_id = self._owners.pop(session_id, None)
+            if shard_id is None:
+                return None
+            shard = self._shards[shard_id]
+            shard.sessions -= 1
+            self._active += 1
+
+        try:
+            return shard.call("end", session_id)
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    # --- Scaling ---
+
+    def resize(self, workers):
+        """
+        Changes the number of worker processes while running.
+        Only the sessions whose owner changed on the ring are moved.
+        Concurrent calls run one after another.
+        Returns the number of sessions migrated.
+        """
+        if workers < 1:
+            raise ValueError("A router needs at least one worker.")
+
+        # One resize at a time: a second one waits for the first to finish,
+        # then for the turns that were queued behind it.
+        with self._cond:
+            while self._resizing:
+                self._cond.wait()
+            self._resizing = True
+            while self._active:
+                self._cond.wait()
+
+        try:
+            current = len(self._shards)
+            removed = []
+            if workers > current:
+                self._add_shards(workers - current)
+            elif workers < current:
+                # Retire the newest workers first
+                with self._cond:
+                    removed = sorted(self._shards)[workers:]
+                    for shard_id in removed:
+                        self._ring.remove(shard_id)
+
+            # Group sessions by (old worker, new worker)
+            with self._cond:
+                owners = list(self._owners.items())
+            moves = {}
+            for session_id, old_id in owners:
+                new_id = self._ring.shard_for(session_id)
+                if new_id != old_id:
+                    moves.setdefault((old_id, new_id), []).append(session_id)
+
+            for (old_id, new_id), session_ids in moves.items():
+                states = self._shards[old_id].call("export", session_ids)
+                self._shards[new_id].call("import", states)
+                with self._cond:
+                    for session_id in session_ids:
+                        self._owners[session_id] = new_id
+                    self._shards[old_id].sessions -= len(session_ids)
+                    self._shards[new_id].sessions += len(session_ids)
+
+            for shard_id in removed:
+                with self._cond:
+                    shard = self._shards.pop(shard_id)
+                shard.stop()
+
+            return sum(len(session_ids) for session_ids in moves.values())
+        finally:
+            with self._cond:
+                self._resizing = False
+                self._cond.notify_all()
+
+    # --- Reporting ---
+
+    def load(self):
+        """Per-worker load: sessions owned, turns handled, turns in flight, busy time."""
+        with self._cond:
+            return [
+                {
+                    "shard": shard_id,
+                    "pid": shard.process.pid,
+                    "sessions": shard.sessions,
+                    "turns": shard.turns,
+                    "in_flight": shard.in_flight,
+                    "busy_seconds": round(shard.busy_seconds, 3),
+                }
+                for shard_id, shard in sorted(self._shards.items())
+            ]
+
+    def close(self):
+        with self._cond:
+            shards = list(self._shards.values())
+            self._shards.clear()
+        for shard in shards:
+            shard.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
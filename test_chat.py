@@ -1,10 +1,10 @@
 # test_chat.py
 # This master script prompts the user to select which test to run.
 
-import os
 import sys
-import importlib.util
-from freezegun import freeze_time
+from datetime import datetime
+
+from registry import VersionRegistry
 
 # --- TEST CASES ---
 test_prompts = [
@@ -76,40 +76,23 @@ test_prompts = [
     "On the 8th, a bmx comp. 24 contestants. It's not a film festival. Judges and audience score.",
 ]
 
-def load_module_from_path(folder_path, version_name):
-    """
-    Dynamically loads the 'chat_logic.py' module from a given folder.
-    """
-    file_path = os.path.join(folder_path, "chat_logic.py")
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Error: 'chat_logic.py' not found in folder '{folder_path}'")
-        
-    # Create a unique module name to avoid import cache conflicts
-    module_name = f"chat_logic_{version_name.replace(' ', '_').replace('+', '').lower()}"
-    
-    spec = importlib.util.spec_from_file_location(module_name, file_path)
-    if spec is None:
-        raise ImportError(f"Could not create import spec for {file_path}")
-        
-    chat_module = importlib.util.module_from_spec(spec)
-    
-    spec.loader.exec_module(chat_module)
-    
-    return chat_module
-
+# Reference "now" for relative dates, to match debug output.
+# Passed to the logic directly instead of freezing the clock process-wide.
+REFERENCE_DATE = datetime(2025, 10, 29)
 
-# Freeze time to match debug output
-@freeze_time("2025-10-29")
-def run_tests(chat_module, version_name):
+def run_tests(chat_module, version_name, now=REFERENCE_DATE):
     """
     Runs the full test suite using the provided (dynamically loaded) module.
     """
     print(f"\n--- 🧪 Starting Test for: {version_name} ---")
     failures = []
     
-    # Turn off debug spam for the test run summary
-    if hasattr(chat_module, 'DEBUG'):
-        chat_module.DEBUG = False 
+    # Use our own extractor with debug off, instead of changing
+    # the module's DEBUG (which other callers may be relying on).
+    if hasattr(chat_module, 'Extractor'):
+        extractor = chat_module.Extractor(debug=False)
+    else:
+        extractor = chat_module
 
     for i, prompt in enumerate(test_prompts, 1):
         print(f"\nRunning test case {i}...")
@@ -123,10 +106,10 @@ def run_tests(chat_module, version_name):
         }
 
         # Run the extraction logic from the loaded module
-        chat_module.update_details_and_get_feedback(prompt, event_details)
+        extractor.update_details_and_get_feedback(prompt, event_details, now)
         
         # Check if the bot would ask another question
-        next_question = chat_module.get_next_question(event_details)
+        next_question = extractor.get_next_question(event_details)
         
         if next_question is None:
             # All details were filled
@@ -155,6 +138,9 @@ def run_tests(chat_module, version_name):
             print(f"\nCase {fail['case_index']}: {fail['prompt']}")
             print(f"  -> First question asked: '{fail['first_missing_info']}'")
             print(f"  -> Final State: {fail['final_state']}")
+    if hasattr(extractor, 'prefilter_stats'):
+        prefilter = extractor.prefilter_stats.snapshot()
+        print(f"Date prefilter skipped {prefilter['skipped']} of {prefilter['checked']} date lookups.")
     print("-" * 50)
 
 
@@ -162,33 +148,32 @@ def main():
     """
     Main menu to prompt the user for which version to test.
     """
-    # Define the versions based on folder structure
-    versions = {
-        "1": ("V1. NLP", "V1. NLP (Simple Regex)"),
-        "2": ("V2. NLP + fallback", "V2. NLP + Fallback"),
-        "3": ("V3. NLP + spacy", "V3. NLP + spaCy (V13 Hybrid)"),
-    }
+    # Modules are cached by the registry, so picking the same version
+    # again doesn't re-run its chat_logic.py (unless the file changed).
+    registry = VersionRegistry()
 
     while True:
+        # Rescan each time, so new version folders show up in the menu
+        versions = registry.versions()
+
         print("\n--- Chatbot Test Harness ---")
         print("Select the logic version to test:")
-        print(" 1. V1. NLP (Simple Regex)")
-        print(" 2. V2. NLP + Fallback")
-        print(" 3. V3. NLP + spaCy")
+        for key, folder_name in versions.items():
+            print(f" {key}. {folder_name}")
         print(" q. Quit")
         
-        choice = input("Enter your choice (1, 2, 3, q): ").strip()
+        choice = input(f"Enter your choice ({', '.join(versions)}, q): ").strip()
         
         if choice in ['q', 'Q']:
             print("Exiting.")
             break
             
         if choice in versions:
-            folder_path, version_name = versions[choice]
+            version_name = versions[choice]
             try:
-                print(f"Loading module from '{folder_path}'...")
-                # Dynamically load the chat_logic.py from that folder
-                chat_module = load_module_from_path(folder_path, version_name)
+                print(f"Loading module from '{version_name}'...")
+                # Dynamically load (or reuse) the chat_logic.py from that folder
+                chat_module = registry.get(choice)
                 
                 # Run the tests
                 run_tests(chat_module, version_name)